@@ -5,11 +5,14 @@ A minimal language for agent-to-agent communication.
 Supports domain namespaces and semantic disambiguation.
 """
 
+import functools
 import json
 import re
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Iterable, Optional, Tuple
 
 # Load atoms
 ATOMS_PATH = Path(__file__).parent / "atoms.json"
@@ -22,6 +25,9 @@ for category in ["types", "entities", "verbs", "modifiers", "time", "quantifiers
     for k, v in ATOMS.get(category, {}).items():
         CORE_LOOKUP[k] = v
 
+# Message types (also part of CORE_LOOKUP)
+TYPES = ATOMS.get("types", {})
+
 # Extended (2-char)
 EXTENDED_LOOKUP = {}
 for k, v in ATOMS.get("extended", {}).items():
@@ -44,6 +50,48 @@ for domain_code, domain_data in ATOMS.get("domains", {}).items():
     for k, v in domain_data.get("atoms", {}).items():
         DOMAIN_LOOKUP[domain_code][k] = v
 
+# Every atom that resolves without parser state, in one table: core, extended,
+# discourse and emotion atoms plus domain-prefixed atoms (e.g., cd:fn), which
+# resolve without activating the domain. The namespaces are disjoint.
+GLOBAL_LOOKUP = {**CORE_LOOKUP, **EXTENDED_LOOKUP, **DISCOURSE_LOOKUP, **EMOTION_LOOKUP}
+for domain_code, domain_atoms in DOMAIN_LOOKUP.items():
+    for k, v in domain_atoms.items():
+        GLOBAL_LOOKUP[f"{domain_code}:{k}"] = v
+assert len(GLOBAL_LOOKUP) == sum(
+    len(d) for d in (CORE_LOOKUP, EXTENDED_LOOKUP, DISCOURSE_LOOKUP, EMOTION_LOOKUP,
+                     *DOMAIN_LOOKUP.values())
+), "atom namespaces overlap"
+
+# Grouping brackets, passed through untranslated
+BRACKETS = frozenset("()[]")
+
+# 2-char discourse and emotion symbols (e.g., >>, :)), matched before letters
+SYMBOLS = frozenset(k for k in {**DISCOURSE_LOOKUP, **EMOTION_LOOKUP} if len(k) == 2)
+
+# Message type names per language
+TYPE_NAMES = {
+    lang: {k: v[lang] for k, v in TYPES.items()}
+    for lang in ("en", "zh")
+}
+
+# Reverse lookup (English -> Lambda)
+REV_LOOKUP = {}
+for cat in ["entities", "verbs", "modifiers", "time", "quantifiers", "extended"]:
+    for k, v in ATOMS.get(cat, {}).items():
+        REV_LOOKUP[v["en"].split("/", 1)[0].lower()] = k
+
+# Words dropped when converting English to Lambda
+ARTICLES = frozenset({"the", "a", "an", "is", "are", "to"})
+
+# Leading words that mark English input as a command
+IMPERATIVE = frozenset({"please", "do", "find", "make", "create"})
+
+# Punctuation stripped from English input
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+# Domain-prefixed (e.g., cd:fn) and disambiguated (e.g., de'E, lo-) tokens
+_MARKED_RE = re.compile(r"[a-z]{2,3}:[a-z]{2}|[a-z]{2}'[EVS23]|[a-z]{2}-")
+
 # Disambiguation mappings for ambiguous atoms
 # Format: { "atom": { "primary": {...}, "E": {...}, "V": {...}, "2": {...} } }
 DISAMBIG = {
@@ -102,14 +150,24 @@ DISAMBIG = {
 }
 
 
+# Max memoized lookups per parser
+LOOKUP_CACHE_SIZE = 4096
+# Max memoized lookups in each module-wide table cache, shared by all parsers
+STATIC_LOOKUP_CACHE_SIZE = 4096
+# Max memoized translations; only messages up to TRANSLATE_CACHE_MAX_LEN
+# chars are kept, since repeated traffic (heartbeats, ACKs) is short
+TRANSLATE_CACHE_SIZE = 4096
+TRANSLATE_CACHE_MAX_LEN = 256
+
+
 def parse_disambig(token: str) -> Tuple[str, Optional[str]]:
     """Parse disambiguation marker from token.
     
     Returns (base_token, marker) where marker is E, V, S, 2, 3, or - 
     """
-    if "'" in token:
-        parts = token.split("'", 1)
-        return parts[0], parts[1]
+    idx = token.find("'")
+    if idx >= 0:
+        return token[:idx], token[idx + 1:]
     if token.endswith("-"):
         return token[:-1], "-"
     return token, None
@@ -122,224 +180,391 @@ class LambdaParser:
         self.active_domains: list[str] = []
         self.context: dict = {}
         self.definitions: dict = {}
+        # Atoms of all active domains merged; earlier domains win
+        self._domain_atoms: dict = {}
+        # (token, lang) -> lookup result; reset whenever domains/definitions change
+        self._lookup_cache: dict = {}
+        # Tokens that definitions make known or unknown; while any exist the
+        # compiled tokenizer patterns don't apply
+        self._redefined: set = set()
     
     def set_domain(self, domain: str):
         """Activate a domain namespace."""
         if domain in DOMAIN_LOOKUP:
             if domain not in self.active_domains:
                 self.active_domains.append(domain)
+                self._domain_atoms = {**DOMAIN_LOOKUP[domain], **self._domain_atoms}
+                self._lookup_cache.clear()
+                self._update_redefined(self.definitions)
     
     def clear_domains(self):
         """Clear all domain namespaces."""
         self.active_domains = []
+        self._domain_atoms = {}
+        self._lookup_cache.clear()
+        self._update_redefined(self.definitions)
+    
+    def reset(self):
+        """Drop all domains, definitions and context."""
+        if self.active_domains or self.definitions:
+            self.active_domains = []
+            self.definitions = {}
+            self._domain_atoms = {}
+            self._lookup_cache.clear()
+            self._redefined.clear()
+        self.context.clear()
     
     def define(self, key: str, value: str):
         """Set a definition for disambiguation."""
         self.definitions[key] = value
+        self._lookup_cache.clear()
+        self._update_redefined((key,))
+    
+    def _update_redefined(self, keys: Iterable[str]):
+        """Track which tokens the given definition keys make known or unknown."""
+        for key in keys:
+            # Only a 1-char or 2-char lowercase key is a token the patterns
+            # match; the empty key is the base of the bare markers - and '
+            if len(key) == 1 or (len(key) == 2 and key.isalpha() and key.islower()):
+                tokens = (key,)
+            elif not key:
+                tokens = ("-", "'")
+            else:
+                continue
+            for t in tokens:
+                base, marker = parse_disambig(t)
+                if base != key or t in TYPES:
+                    continue
+                known = bool(self._lookup_atoms(base, marker, "en"))
+                if bool(self.definitions[key]) != known:
+                    self._redefined.add(t)
+                else:
+                    self._redefined.discard(t)
     
     def lookup(self, token: str, lang: str = "en") -> Optional[str]:
         """Look up a token across all active lookups, with disambiguation."""
+        key = (token, lang)
+        cache = self._lookup_cache
+        if key in cache:
+            return cache[key]
+        if len(cache) >= LOOKUP_CACHE_SIZE:
+            cache.clear()
+        result = cache[key] = self._lookup_uncached(token, lang)
+        return result
+    
+    def _lookup_uncached(self, token: str, lang: str) -> Optional[str]:
         base, marker = parse_disambig(token)
         
         # Check definitions first
         if base in self.definitions:
             return self.definitions[base]
+        return self._lookup_atoms(base, marker, lang)
+    
+    def _lookup_atoms(self, base: str, marker: Optional[str], lang: str) -> Optional[str]:
+        """Look up a parsed token in the active domains and tables, ignoring definitions."""
+        # Check active domains, which rank below disambiguated atoms;
+        # domain keys have no ':', so domain-prefixed (e.g., cd:fn) tokens miss
+        if self._domain_atoms and base not in DISAMBIG:
+            info = self._domain_atoms.get(base)
+            if info is not None:
+                return info[lang]
         
-        # Check disambiguation
-        if base in DISAMBIG:
-            if marker and marker in DISAMBIG[base]:
-                return DISAMBIG[base][marker][lang]
-            return DISAMBIG[base]["primary"][lang]
-        
-        # Check domain-prefixed (e.g., cd:fn)
-        if ":" in base:
-            parts = base.split(":", 1)
-            if len(parts) == 2:
-                domain, atom = parts
-                if domain in DOMAIN_LOOKUP and atom in DOMAIN_LOOKUP[domain]:
-                    return DOMAIN_LOOKUP[domain][atom][lang]
-        
-        # Check active domains first
-        for domain in self.active_domains:
-            if base in DOMAIN_LOOKUP[domain]:
-                return DOMAIN_LOOKUP[domain][base][lang]
-        
-        # Check discourse (2-char special)
-        if base in DISCOURSE_LOOKUP:
-            return DISCOURSE_LOOKUP[base][lang]
-        
-        # Check emotion
-        if base in EMOTION_LOOKUP:
-            return EMOTION_LOOKUP[base][lang]
+        return _lookup_static(base, marker, lang)
+    
+    def tokenize(self, msg: str, blocks: bool = True) -> list[str]:
+        """Split Λ message into tokens.
         
-        # Check extended (2-char)
-        if base in EXTENDED_LOOKUP:
-            return EXTENDED_LOOKUP[base][lang]
+        Namespace/definition blocks are always applied; with blocks=False
+        they are left out of the returned tokens.
+        """
+        tokens = []
+        pos = 0
         
-        # Check core (1-char)
-        if base in CORE_LOOKUP:
-            return CORE_LOOKUP[base][lang]
+        while pos < len(msg):
+            if self._redefined:
+                # Compiling a pattern per definition state would let a message
+                # of many short {def:..} blocks cost O(blocks x definitions)
+                self._scan(msg, pos, tokens, blocks)
+                break
+            domains = frozenset(self.active_domains)
+            # No blocks left: let the regex engine build the whole token list
+            if msg.find('{', pos) == -1:
+                tokens += _token_re(domains, False).findall(msg, pos)
+                break
+            for match in _token_re(domains, True).finditer(msg, pos):
+                if match["block"] is None:
+                    tokens.append(match["tok"])
+                else:
+                    if blocks:
+                        tokens.append(match["tok"])
+                    if match["ns"] is not None:
+                        self.set_domain(match["ns"])
+                    elif match["defs"] is not None:
+                        self.define_block(match["defs"])
+                    # Blocks change the known atoms, so rescan in the new state
+                    pos = match.end()
+                    break
+            else:
+                break
         
-        return None
+        return tokens
     
-    def tokenize(self, msg: str) -> list[str]:
-        """Split Λ message into tokens."""
-        tokens = []
-        i = 0
+    def _scan(self, msg: str, pos: int, tokens: list[str], blocks: bool):
+        """Tokenize msg from pos one char at a time, appending to tokens.
         
-        while i < len(msg):
-            # Skip whitespace
-            if msg[i].isspace():
-                i += 1
+        Matches the same tokens as the compiled patterns, but asks lookup()
+        which atoms are known, so it follows definitions as they change.
+        """
+        n = len(msg)
+        while pos < n:
+            c = msg[pos]
+            if c.isspace():
+                pos += 1
                 continue
             
-            # Check for namespace/definition block {ns:xx} or {def:...}
-            if msg[i] == '{':
-                j = msg.find('}', i)
-                if j != -1:
-                    block = msg[i+1:j]
+            if c == '{':
+                end = msg.find('}', pos)
+                if end != -1:
+                    block = msg[pos + 1:end]
                     if block.startswith('ns:'):
-                        ns = block[3:]
-                        self.set_domain(ns)
+                        self.set_domain(block[3:])
                     elif block.startswith('def:'):
-                        # Parse definitions like def:fe=feel,lo=love
-                        defs = block[4:].split(',')
-                        for d in defs:
-                            if '=' in d:
-                                k, v = d.split('=', 1)
-                                self.define(k.strip(), v.strip().strip('"'))
-                    tokens.append('{' + block + '}')
-                    i = j + 1
+                        self.define_block(block[4:])
+                    if blocks:
+                        tokens.append(msg[pos:end + 1])
+                    pos = end + 1
                     continue
             
-            # Check for brackets
-            if msg[i] in "()[]":
-                tokens.append(msg[i])
-                i += 1
-                continue
-            
-            # Check for domain-prefixed token (e.g., cd:fn)
-            match = re.match(r'([a-z]{2,3}):([a-z]{2})', msg[i:])
-            if match:
-                tokens.append(match.group(0))
-                i += len(match.group(0))
-                continue
-            
-            # Check for disambiguated token (e.g., de'E, lo-)
-            match = re.match(r"([a-z]{2})'([EVS23])|([a-z]{2})-", msg[i:])
-            if match:
-                tokens.append(match.group(0))
-                i += len(match.group(0))
-                continue
-            
-            # Check for 2-char discourse (>>, <<, etc.)
-            if i + 1 < len(msg):
-                two_char = msg[i:i+2]
-                if two_char in DISCOURSE_LOOKUP or two_char in EMOTION_LOOKUP:
-                    tokens.append(two_char)
-                    i += 2
-                    continue
-            
-            # Check for 2-char extended tokens
-            if i + 1 < len(msg) and msg[i:i+2].isalpha() and msg[i:i+2].islower():
-                two_char = msg[i:i+2]
-                if self.lookup(two_char):
-                    tokens.append(two_char)
-                    i += 2
-                    continue
-            
-            # Single char (type, entity, verb, modifier)
-            if self.lookup(msg[i]):
-                tokens.append(msg[i])
-                i += 1
-                continue
-            
-            # Check core lookup directly for types
-            if msg[i] in ATOMS.get("types", {}):
-                tokens.append(msg[i])
-                i += 1
-                continue
-            
-            # Unknown - collect until known char or space
-            j = i + 1
-            while j < len(msg) and not msg[j].isspace():
-                if msg[j] in "()[]{}":
-                    break
-                if self.lookup(msg[j]):
-                    break
-                if msg[j] in ATOMS.get("types", {}):
-                    break
-                j += 1
-            tokens.append(msg[i:j])
-            i = j
-        
-        return tokens
+            # Brackets, then domain-prefixed and disambiguated atoms
+            if c in "()[]":
+                end = pos + 1
+            else:
+                match = _MARKED_RE.match(msg, pos)
+                if match:
+                    end = match.end()
+                else:
+                    two = msg[pos:pos + 2]
+                    if len(two) == 2 and (two in SYMBOLS or (
+                            two.isalpha() and two.islower() and self.lookup(two))):
+                        end = pos + 2
+                    elif c in TYPES or self.lookup(c):
+                        end = pos + 1
+                    else:
+                        # Unknown: run up to the next space, bracket or known char
+                        end = pos + 1
+                        while end < n:
+                            c = msg[end]
+                            if (c.isspace() or c in "()[]{}" or c in TYPES
+                                    or self.lookup(c)):
+                                break
+                            end += 1
+            tokens.append(msg[pos:end])
+            pos = end
+    
+    def define_block(self, defs: str):
+        """Apply a definition block body like fe=feel,lo=love."""
+        for d in defs.split(','):
+            if '=' in d:
+                k, v = d.split('=', 1)
+                self.define(k.strip(), v.strip().strip('"'))
 
 
-def translate_to_english(msg: str) -> str:
-    """Translate Λ message to English."""
-    parser = LambdaParser()
-    tokens = parser.tokenize(msg)
-    
-    if not tokens:
-        return ""
+def _trie_pattern(words: set) -> str:
+    """Build a regex alternation for 2-char words, factored by first char.
     
+    e.g. {"co", "cd", "me"} -> "c[do]|me", so the regex engine tests each
+    first char once instead of trying every word in turn.
+    """
+    seconds: dict[str, list[str]] = {}
+    for w in sorted(words):
+        seconds.setdefault(w[0], []).append(w[1])
+    branches = []
+    for first, rest in seconds.items():
+        tail = "".join(map(re.escape, rest))
+        branches.append(re.escape(first) + (tail if len(rest) == 1 else f"[{tail}]"))
+    return "|".join(branches)
+
+
+@functools.lru_cache(maxsize=64)
+def _atom_pattern(domains: frozenset) -> str:
+    """Build the tokenizer's atom alternation for a set of active domains.
+    
+    Alternatives are tried in priority order: brackets, domain-prefixed atoms,
+    disambiguated atoms, known 2-char atoms (symbols and letters), known 1-char
+    atoms, then an unknown run up to the next known char. Definitions are left
+    out; LambdaParser._scan() handles any that change which atoms are known.
+    """
+    probe = LambdaParser()
+    for domain in domains:
+        probe.set_domain(domain)
+    
+    two_candidates = set(DISAMBIG) | set(EXTENDED_LOOKUP)
+    for domain in domains:
+        two_candidates |= set(DOMAIN_LOOKUP[domain])
+    two_char = sorted(
+        k for k in two_candidates
+        if len(k) == 2 and k.isalpha() and k.islower() and probe.lookup(k)
+    )
+    one_candidates = set(CORE_LOOKUP) | {"-", "'"}
+    one_char = sorted(
+        {c for c in one_candidates if len(c) == 1 and probe.lookup(c)}
+        | set(TYPES)
+    )
+    
+    alternatives = [
+        r"[()\[\]]",
+        r"[a-z]{2,3}:[a-z]{2}",
+        r"[a-z]{2}'[EVS23]|[a-z]{2}-",
+        _trie_pattern(SYMBOLS | set(two_char)),
+    ]
+    known = "".join(map(re.escape, one_char))
+    if known:
+        alternatives.append(f"[{known}]")
+    alternatives.append(rf"\S[^\s()\[\]{{}}{known}]*")
+    return "|".join(a for a in alternatives if a)
+
+
+@functools.lru_cache(maxsize=64)
+def _token_re(domains: frozenset, blocks: bool) -> re.Pattern:
+    """Compile the tokenizer regex for a set of active domains.
+    
+    Without blocks, findall() yields the tokens of block-free text. With
+    blocks, blocks are tried first and each match has "tok" and "block" groups
+    for finditer(). Each is compiled only when first needed, so block-free
+    messages never pay for the block pattern.
+    """
+    atoms = _atom_pattern(domains)
+    if not blocks:
+        return re.compile(rf"\s*({atoms})")
+    block = r"(?P<block>\{(?:ns:(?P<ns>[^}]*)|def:(?P<defs>[^}]*)|[^}]*)\})"
+    return re.compile(rf"\s*(?P<tok>{block}|{atoms})")
+
+
+@functools.lru_cache(maxsize=STATIC_LOOKUP_CACHE_SIZE)
+def _lookup_static(base: str, marker: Optional[str], lang: str) -> Optional[str]:
+    """Look up a parsed token in the tables that don't depend on parser state."""
+    # Check disambiguation
+    if base in DISAMBIG:
+        if marker and marker in DISAMBIG[base]:
+            return DISAMBIG[base][marker][lang]
+        return DISAMBIG[base]["primary"][lang]
+    
+    # Check domain-prefixed (e.g., cd:fn), discourse, emotion,
+    # extended (2-char) and core (1-char)
+    info = GLOBAL_LOOKUP.get(base)
+    if info is not None:
+        return info[lang]
+    
+    return None
+
+
+@functools.lru_cache(maxsize=STATIC_LOOKUP_CACHE_SIZE)
+def _lookup_stateless(token: str, lang: str) -> Optional[str]:
+    """Look up a token as a parser with no domains or definitions would."""
+    base, marker = parse_disambig(token)
+    return _lookup_static(base, marker, lang)
+
+
+_thread_state = threading.local()
+
+
+def _default_parser() -> LambdaParser:
+    """Return this thread's shared parser, reset to a clean state."""
+    parser = getattr(_thread_state, "parser", None)
+    if parser is None:
+        parser = _thread_state.parser = LambdaParser()
+    else:
+        parser.reset()
+    return parser
+
+
+def _prepare(msg: str) -> Tuple[list[str], Callable[[str, str], Optional[str]]]:
+    """Tokenize a message for translation, returning (tokens, lookup)."""
+    if '{' not in msg:
+        # No blocks, so parser state stays empty: skip the parser entirely
+        return _token_re(frozenset(), False).findall(msg), _lookup_stateless
+    parser = _default_parser()
+    return parser.tokenize(msg, blocks=False), parser.lookup
+
+
+def _collect_parts(
+    lookup: Callable[[str, str], Optional[str]], tokens: list[str], lang: str
+) -> Tuple[list[str], str]:
+    """Translate block-free tokens into one language, returning (parts, message type)."""
     parts = []
     msg_type = ""
+    types = TYPE_NAMES[lang]
     
     for t in tokens:
-        # Skip namespace/definition blocks
-        if t.startswith('{') and t.endswith('}'):
-            continue
-        
-        if t in ATOMS["types"]:
-            msg_type = ATOMS["types"][t]["en"]
+        type_name = types.get(t)
+        if type_name is not None:
+            msg_type = type_name
         else:
-            info = parser.lookup(t, "en")
-            if info:
-                parts.append(info)
-            elif t in "()[]":
-                parts.append(t)
-            else:
-                parts.append(f"[{t}]")
+            # Known atom, bracket passthrough, or [unknown]
+            parts.append(lookup(t, lang) or (t if t in BRACKETS else f"[{t}]"))
     
-    result = " ".join(parts)
+    return parts, msg_type
+
+
+def _render(
+    lookup: Callable[[str, str], Optional[str]], tokens: list[str], lang: str, sep: str
+) -> str:
+    """Render tokens in one language, prefixed with the message type."""
+    parts, msg_type = _collect_parts(lookup, tokens, lang)
+    result = sep.join(parts)
     if msg_type:
         result = f"({msg_type}) {result}"
     return result
 
 
+def _translate(msg: str, lang: str, sep: str) -> str:
+    """Translate Λ message to one language, joining parts with sep."""
+    tokens, lookup = _prepare(msg)
+    return _render(lookup, tokens, lang, sep)
+
+
+def _translate_pair(msg: str) -> Tuple[str, str]:
+    """Translate Λ message to (English, Chinese), tokenizing only once."""
+    tokens, lookup = _prepare(msg)
+    return _render(lookup, tokens, "en", " "), _render(lookup, tokens, "zh", "")
+
+
+@functools.lru_cache(maxsize=TRANSLATE_CACHE_SIZE)
+def _translate_cached(msg: str) -> Tuple[str, str]:
+    """Memoized _translate_pair(), shared by all translate functions."""
+    return _translate_pair(msg)
+
+
+def translate(msg: str) -> Tuple[str, str]:
+    """Translate Λ message to (English, Chinese), tokenizing only once."""
+    if len(msg) <= TRANSLATE_CACHE_MAX_LEN:
+        return _translate_cached(msg)
+    return _translate_pair(msg)
+
+
+def translate_to_english(msg: str) -> str:
+    """Translate Λ message to English."""
+    if len(msg) <= TRANSLATE_CACHE_MAX_LEN:
+        return _translate_cached(msg)[0]
+    return _translate(msg, "en", " ")
+
+
 def translate_to_chinese(msg: str) -> str:
     """Translate Λ message to Chinese."""
-    parser = LambdaParser()
-    tokens = parser.tokenize(msg)
-    
-    if not tokens:
-        return ""
-    
-    parts = []
-    msg_type = ""
-    
-    for t in tokens:
-        # Skip namespace/definition blocks
-        if t.startswith('{') and t.endswith('}'):
-            continue
-        
-        if t in ATOMS["types"]:
-            msg_type = ATOMS["types"][t]["zh"]
-        else:
-            info = parser.lookup(t, "zh")
-            if info:
-                parts.append(info)
-            elif t in "()[]":
-                parts.append(t)
-            else:
-                parts.append(f"[{t}]")
-    
-    result = "".join(parts)
-    if msg_type:
-        result = f"({msg_type}) {result}"
-    return result
+    if len(msg) <= TRANSLATE_CACHE_MAX_LEN:
+        return _translate_cached(msg)[1]
+    return _translate(msg, "zh", "")
+
+
+def translate_batch(msgs: Iterable[str], lang: str = "en") -> list[str]:
+    """Translate many Λ messages to English ("en") or Chinese ("zh")."""
+    translators = {"en": translate_to_english, "zh": translate_to_chinese}
+    if lang not in translators:
+        raise ValueError(
+            f"unsupported language {lang!r}, expected one of: {', '.join(translators)}"
+        )
+    translate_one = translators[lang]
+    return [translate_one(msg) for msg in msgs]
 
 
 def english_to_lambda(text: str) -> str:
@@ -351,17 +576,9 @@ def english_to_lambda(text: str) -> str:
     
     # Detect question
     is_question = text.endswith("?")
-    text = re.sub(r"[^\w\s]", "", text)
-    
-    # Build reverse lookup (English -> Lambda)
-    rev = {}
-    for cat in ["entities", "verbs", "modifiers", "time", "quantifiers"]:
-        for k, v in ATOMS.get(cat, {}).items():
-            en_word = v["en"].split("/")[0].lower()
-            rev[en_word] = k
-    for k, v in ATOMS.get("extended", {}).items():
-        en_word = v["en"].split("/")[0].lower()
-        rev[en_word] = k
+    text = _PUNCT_RE.sub("", text)
+    
+    rev = REV_LOOKUP
     
     # Word replacement
     words = text.split()
@@ -370,7 +587,7 @@ def english_to_lambda(text: str) -> str:
     # Determine type prefix
     if is_question:
         result.append("?")
-    elif any(w in ["please", "do", "find", "make", "create"] for w in words[:2]):
+    elif words and (words[0] in IMPERATIVE or (len(words) > 1 and words[1] in IMPERATIVE)):
         result.append(".")
     else:
         result.append("!")
@@ -378,7 +595,7 @@ def english_to_lambda(text: str) -> str:
     for w in words:
         if w in rev:
             result.append(rev[w])
-        elif w in ["the", "a", "an", "is", "are", "to"]:
+        elif w in ARTICLES:
             continue  # Skip common words
     
     return "".join(result)
@@ -474,9 +691,10 @@ def interactive_mode():
         elif cmd == "domains":
             print("Active:", parser.active_domains or "(none)")
         else:
-            # Default: treat as Lambda, translate to English
-            print(f"EN: {translate_to_english(line)}")
-            print(f"ZH: {translate_to_chinese(line)}")
+            # Default: treat as Lambda, translate to English and Chinese
+            en, zh = translate(line)
+            print(f"EN: {en}")
+            print(f"ZH: {zh}")
 
 
 def run_tests():
@@ -508,6 +726,57 @@ def run_tests():
             print(f"  ✗ {input_msg} → {result} (expected: {expected})")
             failed += 1
     
+    # translate() must match the single-language functions
+    pair_tests = [
+        # (input, expected_en, expected_zh)
+        ("!Ilo", "love", "爱"),
+        ("{ns:cd}!If/bg", "bug", "缺陷"),
+    ]
+    
+    for input_msg, expected_en, expected_zh in pair_tests:
+        en, zh = translate(input_msg)
+        if (expected_en in en and expected_zh in zh
+                and en == translate_to_english(input_msg)
+                and zh == translate_to_chinese(input_msg)):
+            print(f"  ✓ translate({input_msg}) → {en} / {zh}")
+            passed += 1
+        else:
+            print(f"  ✗ translate({input_msg}) → {en} / {zh} "
+                  f"(expected: {expected_en} / {expected_zh})")
+            failed += 1
+    
+    # A batch must not leak domain state from one message into the next
+    batch = translate_batch(["{ns:cd}!If/bg", "!If/bg"])
+    if "bug" in batch[0] and "bug" not in batch[1]:
+        print(f"  ✓ translate_batch → {batch}")
+        passed += 1
+    else:
+        print(f"  ✗ translate_batch → {batch} (expected: bug only in the first)")
+        failed += 1
+    
+    try:
+        translate_batch(["!Ik"], "fr")
+    except ValueError as e:
+        print(f"  ✓ translate_batch(lang='fr') → ValueError: {e}")
+        passed += 1
+    else:
+        print("  ✗ translate_batch(lang='fr') → no error (expected: ValueError)")
+        failed += 1
+    
+    # Many short definitions must not make tokenizing slow
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    many_defs = "".join(f"{{def:{a}{b}=x}}" for a in letters for b in letters) + "!Ik"
+    start = time.perf_counter()
+    result = translate_to_english(many_defs)
+    elapsed = time.perf_counter() - start
+    if elapsed < 0.5 and "know" in result:
+        print(f"  ✓ 676 {{def:..}} blocks → {result} in {elapsed * 1000:.1f} ms")
+        passed += 1
+    else:
+        print(f"  ✗ 676 {{def:..}} blocks → {result} in {elapsed * 1000:.1f} ms "
+              f"(expected: know, under 500 ms)")
+        failed += 1
+    
     print(f"\nResults: {passed} passed, {failed} failed")
     return failed == 0
 
@@ -551,8 +820,8 @@ if __name__ == "__main__":
                 info_zh = parser.lookup(t, "zh")
                 if info_en:
                     print(f"  {t} → {info_en} / {info_zh}")
-                elif t in ATOMS.get("types", {}):
-                    print(f"  {t} → {ATOMS['types'][t]['en']} / {ATOMS['types'][t]['zh']}")
+                elif t in TYPES:
+                    print(f"  {t} → {TYPES[t]['en']} / {TYPES[t]['zh']}")
                 else:
                     print(f"  {t} → (unknown)")
     